@@ -0,0 +1,214 @@
+"""RSS comparison of the member-holding baseline, default and lean memory configurations.
+
+Simulates guilds the way the bot holds them in memory: a member cache per
+guild plus queue and history songs. Each guild is built from a GUILD_CREATE
+style payload with its members and voice states, so discord.py itself decides
+which members to cache from the configuration's member_cache_flags.
+
+- baseline: default member cache flags and songs hold Member objects
+- default: default member cache flags and songs hold requester ids and names
+- lean: LEAN_MEMORY intents and flags, songs hold requester ids and names
+
+baseline vs default isolates the song field change, default vs lean the
+member cache change.
+
+Usage: python bench_memory.py [--guilds 1000 10000] [--members 50]
+"""
+import argparse
+import gc
+import os
+import random
+import resource
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+QUEUE_SONGS = 20
+HISTORY_SONGS = 50
+
+@dataclass
+class MemberSong:
+    title: str
+    webpage_url: str
+    duration: Optional[int] = None
+    requester: Optional[Any] = None
+    stream_url: Optional[str] = None
+    thumbnail: Optional[str] = None
+    video_id: Optional[str] = None
+
+@dataclass
+class LeanSong:
+    title: str
+    webpage_url: str
+    duration: Optional[int] = None
+    requester_id: Optional[int] = None
+    requester_name: Optional[str] = None
+    stream_url: Optional[str] = None
+    thumbnail: Optional[str] = None
+    video_id: Optional[str] = None
+
+def current_rss() -> int:
+    """Resident set size in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # ru_maxrss is the peak, in kilobytes on Linux and bytes on macOS
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+MODES = {
+    # mode: (lean intents and cache flags, songs hold Member objects)
+    'baseline': (False, True),
+    'default': (False, False),
+    'lean': (True, False),
+}
+
+def make_state(lean: bool):
+    import discord
+    from discord.state import ConnectionState
+
+    intents = discord.Intents.default()
+    intents.members = not lean
+    if lean:
+        member_cache_flags = discord.MemberCacheFlags.none()
+        member_cache_flags.voice = True
+    else:
+        member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+
+    return ConnectionState(
+        dispatch=lambda *args, **kwargs: None,
+        handlers={},
+        hooks={},
+        http=None,
+        intents=intents,
+        member_cache_flags=member_cache_flags,
+        chunk_guilds_at_startup=False,
+    )
+
+def make_song(idx: int, member, member_songs: bool):
+    fields = dict(
+        title=f"Simulated track number {idx} (Official Audio)",
+        webpage_url=f"https://www.youtube.com/watch?v={idx:011d}",
+        duration=random.randint(120, 480),
+        thumbnail=f"https://i.ytimg.com/vi/{idx:011d}/hqdefault.jpg",
+        video_id=f"{idx:011d}",
+    )
+    if member_songs:
+        return MemberSong(requester=member, **fields)
+    return LeanSong(requester_id=member.id, requester_name=member.display_name, **fields)
+
+def member_payload(user_id: int) -> dict:
+    return {
+        'user': {
+            'id': user_id,
+            'username': f"user{user_id}",
+            'discriminator': '0',
+            'avatar': None,
+            'global_name': f"User {user_id}",
+        },
+        'roles': [],
+        'flags': 0,
+        'joined_at': None,
+    }
+
+def voice_state_payload(user_id: int, channel_id: int) -> dict:
+    return {
+        'user_id': user_id,
+        'channel_id': channel_id,
+        'session_id': f"session-{user_id}",
+        'deaf': False,
+        'mute': False,
+        'self_deaf': False,
+        'self_mute': False,
+        'self_video': False,
+        'suppress': False,
+        'request_to_speak_timestamp': None,
+    }
+
+def simulate(guild_count: int, members_per_guild: int, voice_members: int, mode: str) -> List[Any]:
+    import discord
+
+    lean, member_songs = MODES[mode]
+    state = make_state(lean)
+    guilds = []
+    user_id = 10 ** 17
+
+    for guild_idx in range(guild_count):
+        guild_id = guild_idx + 1
+        channel_id = 10 ** 16 + guild_id
+        member_ids = list(range(user_id + 1, user_id + members_per_guild + 1))
+        user_id += members_per_guild
+        # Only members in voice can request songs
+        requester_ids = member_ids[:voice_members]
+
+        guild = discord.Guild(
+            data={
+                'id': guild_id,
+                'name': f"guild-{guild_idx}",
+                'channels': [{
+                    'id': channel_id,
+                    'type': 2,
+                    'name': 'Music',
+                    'position': 0,
+                    'permission_overwrites': [],
+                    'bitrate': 64000,
+                    'user_limit': 0,
+                }],
+                'members': [member_payload(member_id) for member_id in member_ids],
+                'voice_states': [voice_state_payload(member_id, channel_id) for member_id in requester_ids],
+            },
+            state=state,
+        )
+        requesters = [guild.get_member(member_id) for member_id in requester_ids]
+
+        queue = [make_song(i, random.choice(requesters), member_songs) for i in range(QUEUE_SONGS)]
+        history = [make_song(i, random.choice(requesters), member_songs) for i in range(HISTORY_SONGS)]
+        guilds.append((guild, queue, history))
+
+    return guilds
+
+def run_child(mode: str, guild_count: int, members_per_guild: int, voice_members: int):
+    import discord  # noqa: F401 - exclude import cost from the measurement
+
+    random.seed(0)
+    gc.collect()
+    before = current_rss()
+    guilds = simulate(guild_count, members_per_guild, voice_members, mode)
+    gc.collect()
+    print(current_rss() - before)
+    del guilds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--guilds', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--members', type=int, default=50, help="members seen per guild")
+    parser.add_argument('--voice-members', type=int, default=5, help="members in voice per guild")
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'GUILDS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]), args.members, args.voice_members)
+        return
+
+    print(f"{'guilds':>8} {'baseline MiB':>13} {'default MiB':>12} {'lean MiB':>9} {'song ids':>9} {'member cache':>13}")
+    for guild_count in args.guilds:
+        results = {}
+        for mode in MODES:
+            # Fresh interpreter per run so freed memory from one run can't hide in the next
+            out = subprocess.run(
+                [sys.executable, __file__, '--child', mode, str(guild_count),
+                 '--members', str(args.members), '--voice-members', str(args.voice_members)],
+                check=True, capture_output=True, text=True,
+            )
+            results[mode] = int(out.stdout.strip()) / (1024 * 1024)
+        song_saving = 1 - results['default'] / results['baseline'] if results['baseline'] else 0.0
+        cache_saving = 1 - results['lean'] / results['default'] if results['default'] else 0.0
+        print(
+            f"{guild_count:>8} {results['baseline']:>13.1f} {results['default']:>12.1f} "
+            f"{results['lean']:>9.1f} {song_saving:>9.0%} {cache_saving:>13.0%}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -19,10 +19,17 @@ Thread(target=run, daemon=True).start()
 # YOUR EXISTING BOT CODE BELOW
 import os
 import asyncio
+import audioop
+import json
 import logging
+import re
+import threading
+import time
 from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Any
 import traceback
+from collections import Counter, OrderedDict, deque
+from itertools import islice
 
 import discord
 from discord import app_commands
@@ -47,12 +54,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger("music-bot")
 
+# Lean memory mode: no members intent and only voice members cached
+LEAN_MEMORY = os.getenv("LEAN_MEMORY", "").lower() in ("1", "true", "yes")
+
 # Intents
 intents = discord.Intents.default()
 intents.message_content = True
 intents.voice_states = True
 intents.guilds = True
-intents.members = True
+intents.members = not LEAN_MEMORY
+
+if LEAN_MEMORY:
+    member_cache_flags = discord.MemberCacheFlags.none()
+    member_cache_flags.voice = True
+else:
+    member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
 
 # Bot with better configuration
 class MusicBot(commands.Bot):
@@ -60,10 +76,12 @@ class MusicBot(commands.Bot):
         super().__init__(
             command_prefix="!",
             intents=intents,
+            member_cache_flags=member_cache_flags,
             help_command=None,
             chunk_guilds_at_startup=False
         )
         self.cleanup_loop_started = False
+        self.warm_task: Optional[asyncio.Task] = None
 
     async def setup_hook(self):
         """Called when the bot is starting up"""
@@ -71,6 +89,7 @@ class MusicBot(commands.Bot):
         if not self.cleanup_loop_started:
             self.cleanup_loop.start()
             self.cleanup_loop_started = True
+        self.warm_task = asyncio.create_task(warm_caches())
         await self.tree.sync()
         logger.info("Application commands synced")
 
@@ -91,11 +110,16 @@ class MusicBot(commands.Bot):
                     guilds_to_remove.append(guild_id)
             
             for guild_id in guilds_to_remove:
-                guild_states.pop(guild_id, None)
+                removed = guild_states.pop(guild_id, None)
+                if removed:
+                    discard_prepared(removed)
                 state_message_channel_map.pop(guild_id, None)
                 
             if guilds_to_remove:
                 logger.info(f"Cleaned up {len(guilds_to_remove)} unused guild states")
+
+            track_cache.expire()
+            await play_stats.save_snapshot()
                 
         except Exception as e:
             logger.error(f"Error in cleanup loop: {e}")
@@ -125,9 +149,43 @@ YTDL_OPTS = {
 
 FFMPEG_OPTIONS = {
     "before_options": "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5 -probesize 32 -analyzeduration 32",
-    "options": "-vn -bufsize 1024k -af volume=0.5",
+    "options": "-vn -bufsize 1024k",
 }
 
+# Loudness normalization
+LOUDNESS_TARGET_LUFS = -20.0
+DEFAULT_TRACK_GAIN = 0.5  # used until a track has been analysed
+MAX_TRACK_GAIN = 2.0
+LOUDNESS_MAX_JOBS = 2
+LOUDNESS_TIMEOUT_SECONDS = 300
+LOUDNESS_WINDOW_SECONDS = 600  # long mixes are measured on their first 10 minutes
+LOUDNESS_RETRY_SECONDS = 1800  # doubled after each failure
+LOUDNESS_MAX_FAILURES = 3  # then the track keeps the default gain
+LOUDNESS_CACHE_FILE = os.getenv("LOUDNESS_CACHE_FILE", "loudness_cache.json")
+
+# Play history and cache warming
+PLAY_LOG_FILE = os.getenv("PLAY_LOG_FILE", "play_log.tsv")
+PLAY_STATS_FILE = os.getenv("PLAY_STATS_FILE", "play_stats.json")
+STREAM_URL_TTL = 5 * 3600  # YouTube stream URLs expire after about 6 hours
+WARM_TOP_GLOBAL = 25
+WARM_TOP_PER_GUILD = 5
+WARM_INTERVAL_SECONDS = float(os.getenv("WARM_INTERVAL_SECONDS", "2"))
+WARM_MAX_TRACKS = int(os.getenv("WARM_MAX_TRACKS", "200"))  # keeps a warm-up well inside STREAM_URL_TTL
+TRACK_METADATA_MAX = 2 * WARM_MAX_TRACKS
+STATS_TOP_COUNT = 10
+
+# Gapless playback
+FRAME_SECONDS = 0.02  # discord.py reads one 20ms frame at a time
+PRESPAWN_LEAD_SECONDS = 5  # spawn the next track's ffmpeg this long before the current one ends
+PREBUFFER_FRAMES = 50  # frames read ahead from the pre-spawned process (1 second)
+CROSSFADE_SECONDS = float(os.getenv("CROSSFADE_SECONDS", "0"))
+MAX_IDLE_PRESPAWNED = int(os.getenv("MAX_IDLE_PRESPAWNED", "8"))
+
+# Read-ahead buffering, in 20ms frames and adapted per guild
+READ_AHEAD_MIN_FRAMES = 50
+READ_AHEAD_DEFAULT_FRAMES = 150
+READ_AHEAD_MAX_FRAMES = 500
+
 # Rate limiting
 class RateLimiter:
     def __init__(self, max_requests: int = 10, window: int = 60):
@@ -151,37 +209,134 @@ class RateLimiter:
 
 rate_limiter = RateLimiter()
 
+# Bound idle pre-spawned ffmpeg processes across all guilds
+class PrespawnLimiter:
+    def __init__(self, max_idle: int = 8):
+        self.max_idle = max_idle
+        self.idle = 0
+
+    def try_acquire(self) -> bool:
+        if self.idle >= self.max_idle:
+            return False
+        self.idle += 1
+        return True
+
+    def release(self):
+        self.idle = max(self.idle - 1, 0)
+
+prespawn_limiter = PrespawnLimiter(MAX_IDLE_PRESPAWNED)
+
 # ----- Enhanced Data Classes -----
 @dataclass
 class Song:
     title: str
     webpage_url: str
     duration: Optional[int] = None
-    requester: Optional[discord.Member] = None
+    requester_id: Optional[int] = None
+    requester_name: Optional[str] = None
     stream_url: Optional[str] = None
     thumbnail: Optional[str] = None
+    video_id: Optional[str] = None
+
+    @property
+    def requester_mention(self) -> Optional[str]:
+        """Mention built from the stored id so no Member object is kept alive"""
+        return f"<@{self.requester_id}>" if self.requester_id else None
 
     def duration_str(self) -> str:
         if not self.duration:
             return "Unknown"
-        mins = int(self.duration // 60)
-        secs = int(self.duration % 60)
-        if mins >= 60:
-            hours = mins // 60
-            mins = mins % 60
-            return f"{hours}:{mins:02d}:{secs:02d}"
-        return f"{mins}:{secs:02d}"
+        return format_duration(self.duration)
+
+def format_duration(seconds: int) -> str:
+    mins = int(seconds // 60)
+    secs = int(seconds % 60)
+    if mins >= 60:
+        hours = mins // 60
+        mins = mins % 60
+        return f"{hours}:{mins:02d}:{secs:02d}"
+    return f"{mins}:{secs:02d}"
+
+class SongQueue:
+    """Song queue that keeps its totals up to date as songs are added and removed"""
+    def __init__(self):
+        self._songs: deque = deque()
+        self.total_duration = 0
+        self.unknown_durations = 0
+        self.requester_counts: Counter = Counter()
+        # Bumped on every mutation so cached renders can be invalidated
+        self.version = 0
+
+    def _added(self, song: Song):
+        if song.duration:
+            self.total_duration += song.duration
+        else:
+            self.unknown_durations += 1
+        self.requester_counts[song.requester_id] += 1
+        self.version += 1
+
+    def _removed(self, song: Song):
+        if song.duration:
+            self.total_duration -= song.duration
+        else:
+            self.unknown_durations -= 1
+        self.requester_counts[song.requester_id] -= 1
+        if self.requester_counts[song.requester_id] <= 0:
+            del self.requester_counts[song.requester_id]
+        self.version += 1
+
+    def append(self, song: Song):
+        self._songs.append(song)
+        self._added(song)
+
+    def appendleft(self, song: Song):
+        self._songs.appendleft(song)
+        self._added(song)
+
+    def extend(self, songs: List[Song]):
+        for song in songs:
+            self.append(song)
+
+    def popleft(self) -> Song:
+        song = self._songs.popleft()
+        self._removed(song)
+        return song
+
+    def clear(self):
+        self._songs.clear()
+        self.total_duration = 0
+        self.unknown_durations = 0
+        self.requester_counts.clear()
+        self.version += 1
+
+    def page(self, start: int, count: int) -> List[Song]:
+        return list(islice(self._songs, start, start + count))
+
+    def __getitem__(self, index: int) -> Song:
+        return self._songs[index]
+
+    def __len__(self) -> int:
+        return len(self._songs)
+
+    def __iter__(self):
+        return iter(self._songs)
 
 @dataclass
 class GuildMusic:
     guild_id: int
-    queue: List[Song] = field(default_factory=list)
+    queue: SongQueue = field(default_factory=SongQueue)
     history: List[Song] = field(default_factory=list)
     current: Optional[Song] = None
     lock: asyncio.Lock = field(default_factory=asyncio.Lock)
     volume: float = 0.5
     loop: bool = False
     skip_votes: set = field(default_factory=set)
+    prepared: Optional["PreparedTrack"] = None
+    prepare_task: Optional[asyncio.Task] = None
+    playing_buffer: Optional["RingBufferSource"] = None
+    read_ahead_frames: int = READ_AHEAD_DEFAULT_FRAMES
+    queue_embeds: Dict[int, discord.Embed] = field(default_factory=dict)
+    queue_embeds_key: Optional[tuple] = None
 
 guild_states: Dict[int, GuildMusic] = {}
 state_message_channel_map: Dict[int, int] = {}
@@ -194,12 +349,17 @@ def get_guild_state(guild_id: int) -> GuildMusic:
 # ----- Enhanced YTDLSource -----
 class YTDLSource:
     @staticmethod
-    async def create_source(search: str, requester: discord.Member, loop: asyncio.AbstractEventLoop = None) -> List[Song]:
+    async def create_source(search: str, requester: discord.abc.User, loop: asyncio.AbstractEventLoop = None) -> List[Song]:
         loop = loop or asyncio.get_event_loop()
         
         # Rate limiting check
         if rate_limiter.is_rate_limited(requester.id):
             raise Exception("You're making too many requests. Please wait a moment.")
+
+        # Known videos skip the extractor, resolve_stream_url checks the stream URL cache at play time
+        cached_song = track_cache.song_for(extract_video_id(search), requester)
+        if cached_song:
+            return [cached_song]
         
         ytdl_instance = yt_dlp.YoutubeDL(YTDL_OPTS)
         
@@ -225,22 +385,28 @@ class YTDLSource:
                 for entry in entries:
                     if not entry:
                         continue
+                    track_cache.remember(entry)
                     songs.append(Song(
                         title=entry.get('title', 'Unknown Title'),
                         webpage_url=entry.get('webpage_url', entry.get('url', '')),
                         duration=int(entry.get('duration', 0)) if entry.get('duration') else None,
-                        requester=requester,
+                        requester_id=requester.id,
+                        requester_name=requester.display_name,
                         thumbnail=entry.get('thumbnail'),
-                        stream_url=None
+                        stream_url=None,
+                        video_id=entry.get('id')
                     ))
             else:
+                track_cache.remember(data)
                 songs.append(Song(
                     title=data.get('title', 'Unknown Title'),
                     webpage_url=data.get('webpage_url', ''),
                     duration=int(data.get('duration', 0)) if data.get('duration') else None,
-                    requester=requester,
+                    requester_id=requester.id,
+                    requester_name=requester.display_name,
                     thumbnail=data.get('thumbnail'),
-                    stream_url=None
+                    stream_url=None,
+                    video_id=data.get('id')
                 ))
         except Exception as e:
             logger.error(f"Error processing YouTube data: {e}")
@@ -255,6 +421,11 @@ class YTDLSource:
     async def resolve_stream_url(song: Song, loop: asyncio.AbstractEventLoop = None):
         if song.stream_url:
             return song.stream_url
+
+        cached_url = track_cache.get_stream_url(song.video_id)
+        if cached_url:
+            song.stream_url = cached_url
+            return song.stream_url
             
         loop = loop or asyncio.get_event_loop()
         ytdl_instance = yt_dlp.YoutubeDL(YTDL_OPTS)
@@ -268,12 +439,603 @@ class YTDLSource:
                 raise Exception("No stream URL found")
                 
             song.stream_url = data['url']
+            track_cache.put_stream_url(song.video_id, song.stream_url)
             return song.stream_url
             
         except Exception as e:
             logger.error(f"Failed to resolve stream URL for {song.title}: {e}")
             raise Exception(f"Failed to get audio stream: {str(e)}")
 
+# ----- Gapless Audio Sources -----
+class RingBufferSource(discord.AudioSource):
+    """Reads ahead from another source on a background thread into a preallocated ring of frame slots"""
+    def __init__(self, original: discord.AudioSource, depth: int, slot_size: int = discord.opus.Encoder.FRAME_SIZE):
+        self.original = original
+        self.depth = depth
+        self.slot_size = slot_size
+        # One extra slot so the frame handed out last is never overwritten while in use
+        self.slots = depth + 1
+        self._buffer = bytearray(self.slots * slot_size)
+        self._view = memoryview(self._buffer)
+        self._lengths = [0] * self.slots
+        # PCM frames go through audioop which accepts any buffer; Opus packets must be bytes
+        self.zero_copy = not original.is_opus()
+
+        self._head = 0
+        self._tail = 0
+        self._eof = False
+        self.closed = False
+        self.frames_read = 0
+        self.underruns = 0
+        self._cond = threading.Condition()
+        self._reader = threading.Thread(target=self._read_ahead, daemon=True, name=f"read-ahead:{id(self):#x}")
+        self._reader.start()
+
+    @property
+    def buffered_frames(self) -> int:
+        return self._tail - self._head
+
+    @property
+    def fill_level(self) -> float:
+        return self.buffered_frames / self.depth
+
+    def _read_ahead(self):
+        try:
+            while True:
+                with self._cond:
+                    while self._tail - self._head >= self.depth and not self.closed:
+                        self._cond.wait()
+                    if self.closed:
+                        return
+
+                data = self.original.read()
+                if not data:
+                    break
+                if len(data) > self.slot_size:
+                    logger.warning(f"Dropping oversized {len(data)} byte frame, ending read-ahead")
+                    break
+
+                slot = self._tail % self.slots
+                start = slot * self.slot_size
+                self._view[start:start + len(data)] = data
+                self._lengths[slot] = len(data)
+
+                with self._cond:
+                    self._tail += 1
+                    self._cond.notify_all()
+        except Exception as e:
+            if not self.closed:
+                logger.error(f"Read-ahead failed: {e}")
+        finally:
+            with self._cond:
+                self._eof = True
+                self._cond.notify_all()
+
+    def wait_for_frames(self, frames: int, timeout: float = 10.0) -> bool:
+        """Block until at least ``frames`` are buffered or the source ends"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self.buffered_frames >= frames or self._eof or self.closed,
+                timeout=timeout
+            )
+
+    def read(self) -> bytes:
+        with self._cond:
+            if self._tail == self._head and not self._eof and self.frames_read:
+                self.underruns += 1
+            while self._tail == self._head and not self._eof and not self.closed:
+                self._cond.wait()
+            if self._tail == self._head or self.closed:
+                return b''
+
+            slot = self._head % self.slots
+            self._head += 1
+            self.frames_read += 1
+            self._cond.notify_all()
+
+        start = slot * self.slot_size
+        frame = self._view[start:start + self._lengths[slot]]
+        return frame if self.zero_copy else bytes(frame)
+
+    def is_opus(self) -> bool:
+        return self.original.is_opus()
+
+    def cleanup(self):
+        with self._cond:
+            if self.closed:
+                return
+            self.closed = True
+            self._cond.notify_all()
+        self.original.cleanup()
+
+class PlaybackSource(discord.PCMVolumeTransformer):
+    """Volume controlled source that tracks frames played and can crossfade into the next track
+
+    The track's loudness gain is folded into the transformer's volume so each
+    frame is scaled exactly once. ``volume`` still reads and writes the user volume.
+    """
+    def __init__(self, original: discord.AudioSource, song: Song, volume: float, gain: float = DEFAULT_TRACK_GAIN):
+        self.gain = gain
+        super().__init__(original, volume=volume)
+        self.song = song
+        # A prepared source may already have been partly played by a crossfade
+        self.frames_played = original.frames_read if isinstance(original, RingBufferSource) else 0
+        self.next_source: Optional[discord.AudioSource] = None
+        self.next_gain = DEFAULT_TRACK_GAIN
+        self.crossfade_frames = int(CROSSFADE_SECONDS / FRAME_SECONDS)
+
+    @property
+    def volume(self) -> float:
+        return self._user_volume
+
+    @volume.setter
+    def volume(self, value: float):
+        self._user_volume = max(value, 0.0)
+        self._volume = self._user_volume * self.gain
+
+    def remaining_seconds(self) -> Optional[float]:
+        if not self.song.duration:
+            return None
+        return max(self.song.duration - self.frames_played * FRAME_SECONDS, 0.0)
+
+    def read(self) -> bytes:
+        ret = super().read()
+        self.frames_played += 1
+
+        incoming_source = self.next_source
+        if not ret or incoming_source is None or not self.crossfade_frames or not self.song.duration:
+            return ret
+
+        remaining_frames = self.song.duration / FRAME_SECONDS - self.frames_played
+        if remaining_frames >= self.crossfade_frames:
+            return ret
+
+        incoming = incoming_source.read()
+        if len(incoming) != len(ret):
+            return ret
+
+        fade_out = max(remaining_frames, 0) / self.crossfade_frames
+        fade_in = (1.0 - fade_out) * min(self.volume * self.next_gain, 2.0)
+        return audioop.add(audioop.mul(ret, 2, fade_out), audioop.mul(incoming, 2, fade_in), 2)
+
+@dataclass
+class PreparedTrack:
+    song: Song
+    source: RingBufferSource
+
+def adapt_read_ahead(state: GuildMusic, source: Optional[RingBufferSource]):
+    """Grow a guild's read-ahead depth after underruns, shrink it slowly otherwise"""
+    if not source or not source.frames_read:
+        return
+    if source.underruns:
+        state.read_ahead_frames = min(state.read_ahead_frames * 2, READ_AHEAD_MAX_FRAMES)
+        logger.info(
+            f"{source.underruns} underruns in guild {state.guild_id}, "
+            f"read-ahead raised to {state.read_ahead_frames} frames"
+        )
+    else:
+        state.read_ahead_frames = max(state.read_ahead_frames - state.read_ahead_frames // 4, READ_AHEAD_MIN_FRAMES)
+
+def _cleanup_spawned(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().cleanup()
+
+async def create_prepared_track(song: Song, depth: int, loop: asyncio.AbstractEventLoop = None) -> PreparedTrack:
+    """Resolve, spawn and pre-buffer a song so it can start without delay"""
+    loop = loop or asyncio.get_event_loop()
+    await YTDLSource.resolve_stream_url(song, loop)
+
+    spawn = loop.run_in_executor(
+        None,
+        lambda: RingBufferSource(discord.FFmpegPCMAudio(song.stream_url, **FFMPEG_OPTIONS), depth)
+    )
+    try:
+        source = await asyncio.shield(spawn)
+    except asyncio.CancelledError:
+        # The executor still finishes spawning, clean the source up once it does
+        spawn.add_done_callback(_cleanup_spawned)
+        raise
+    try:
+        await loop.run_in_executor(None, source.wait_for_frames, min(PREBUFFER_FRAMES, depth))
+    except BaseException:
+        source.cleanup()
+        raise
+    return PreparedTrack(song=song, source=source)
+
+def discard_prepared(state: GuildMusic):
+    """Cancel any pending pre-spawn and release an idle prepared track"""
+    if state.prepare_task and not state.prepare_task.done():
+        state.prepare_task.cancel()
+    state.prepare_task = None
+
+    if state.prepared:
+        state.prepared.source.cleanup()
+        state.prepared = None
+        prespawn_limiter.release()
+
+async def _prepare_next(guild: discord.Guild, playing: PlaybackSource):
+    """Pre-spawn the next track shortly before the current one ends"""
+    state = get_guild_state(guild.id)
+    lead = max(PRESPAWN_LEAD_SECONDS, CROSSFADE_SECONDS + 1)
+
+    while True:
+        vc = guild.voice_client
+        if not vc or vc.source is not playing:
+            return
+        remaining = playing.remaining_seconds()
+        if remaining is None:
+            return
+        if remaining <= lead:
+            break
+        # Poll in steps so pauses push the pre-spawn back
+        await asyncio.sleep(min(remaining - lead, 5))
+
+    upcoming = playing.song if state.loop else (state.queue[0] if state.queue else None)
+    if not upcoming or state.prepared:
+        return
+
+    loudness_cache.schedule(upcoming)
+
+    if not prespawn_limiter.try_acquire():
+        logger.info(f"Pre-spawn limit reached, guild {guild.id} will start {upcoming.title} cold")
+        return
+
+    try:
+        prepared = await create_prepared_track(upcoming, state.read_ahead_frames)
+    except asyncio.CancelledError:
+        prespawn_limiter.release()
+        raise
+    except Exception as e:
+        prespawn_limiter.release()
+        logger.warning(f"Failed to pre-spawn {upcoming.title} in guild {guild.id}: {e}")
+        return
+
+    vc = guild.voice_client
+    if not vc or vc.source is not playing:
+        prepared.source.cleanup()
+        prespawn_limiter.release()
+        return
+
+    state.prepared = prepared
+    playing.next_gain = loudness_cache.gain_for(upcoming) or DEFAULT_TRACK_GAIN
+    playing.next_source = prepared.source
+
+# ----- Loudness Normalization -----
+LOUDNESS_RE = re.compile(r"I:\s+(-?\d+(?:\.\d+)?) LUFS")
+
+async def measure_loudness(url: str) -> float:
+    """Integrated EBU R128 loudness of a stream in LUFS"""
+    proc = await asyncio.create_subprocess_exec(
+        'ffmpeg', '-nostdin', '-hide_banner',
+        *FFMPEG_OPTIONS["before_options"].split(),
+        '-i', url, '-t', str(LOUDNESS_WINDOW_SECONDS),
+        '-vn', '-af', 'ebur128=framelog=quiet', '-f', 'null', '-',
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        _, stderr = await asyncio.wait_for(proc.communicate(), timeout=LOUDNESS_TIMEOUT_SECONDS)
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        proc.kill()
+        await proc.wait()
+        if isinstance(e, asyncio.TimeoutError):
+            raise Exception(f"ffmpeg loudness analysis timed out after {LOUDNESS_TIMEOUT_SECONDS}s")
+        raise
+
+    # The summary printed at the end is the last match
+    matches = LOUDNESS_RE.findall(stderr.decode('utf-8', errors='replace'))
+    if proc.returncode != 0 or not matches:
+        raise Exception(f"ffmpeg loudness analysis failed with code {proc.returncode}")
+    return float(matches[-1])
+
+class LoudnessCache:
+    """Integrated loudness per video id, analysed once in the background and persisted as JSON"""
+    def __init__(self, path: str):
+        self.path = path
+        self.lufs: Dict[str, float] = {}
+        self.pending: Dict[str, asyncio.Task] = {}
+        # video id -> (failure count, time before which it is not retried)
+        self.failures: Dict[str, tuple] = {}
+        self.semaphore = asyncio.Semaphore(LOUDNESS_MAX_JOBS)
+        self.save_lock = asyncio.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.lufs = {video_id: float(lufs) for video_id, lufs in json.load(f).items()}
+            logger.info(f"Loaded loudness for {len(self.lufs)} tracks")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to load loudness cache: {e}")
+
+    def save(self, snapshot: Dict[str, float]):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path)
+
+    def gain_for(self, song: Song) -> Optional[float]:
+        lufs = self.lufs.get(song.video_id) if song.video_id else None
+        if lufs is None:
+            return None
+        return min(10 ** ((LOUDNESS_TARGET_LUFS - lufs) / 20), MAX_TRACK_GAIN)
+
+    def schedule(self, song: Song):
+        """Queue a background analysis unless the track is cached, being analysed or backing off"""
+        if not song.video_id or song.video_id in self.lufs or song.video_id in self.pending:
+            return
+        _, retry_at = self.failures.get(song.video_id, (0, 0.0))
+        if time.time() < retry_at:
+            return
+        self.pending[song.video_id] = asyncio.create_task(self._analyze(song))
+
+    async def _analyze(self, song: Song):
+        try:
+            async with self.semaphore:
+                await YTDLSource.resolve_stream_url(song)
+                lufs = await measure_loudness(song.stream_url)
+        except Exception as e:
+            self._record_failure(song, e)
+            return
+        finally:
+            self.pending.pop(song.video_id, None)
+
+        self.failures.pop(song.video_id, None)
+        self.lufs[song.video_id] = lufs
+        logger.info(f"Measured {lufs:.1f} LUFS for {song.title}")
+        await self.persist()
+
+    def _record_failure(self, song: Song, error: Exception):
+        count = self.failures.get(song.video_id, (0, 0.0))[0] + 1
+        if count >= LOUDNESS_MAX_FAILURES:
+            retry_at = float('inf')
+            logger.warning(f"Loudness analysis failed for {song.title}, giving up after {count} attempts: {error}")
+        else:
+            retry_at = time.time() + LOUDNESS_RETRY_SECONDS * 2 ** (count - 1)
+            logger.warning(f"Loudness analysis failed for {song.title} (attempt {count}): {error}")
+        self.failures[song.video_id] = (count, retry_at)
+
+    async def persist(self):
+        """Write the cache, one save at a time so each one writes the newest snapshot"""
+        try:
+            async with self.save_lock:
+                await asyncio.get_event_loop().run_in_executor(None, self.save, dict(self.lufs))
+        except Exception as e:
+            logger.error(f"Failed to save loudness cache: {e}")
+
+loudness_cache = LoudnessCache(LOUDNESS_CACHE_FILE)
+
+# ----- Play History & Cache Warming -----
+VIDEO_ID_RE = re.compile(
+    r"^(?:https?://)?(?:(?:www\.|m\.|music\.)?youtube\.com/(?:watch\?(?:.*&)?v=|shorts/)|youtu\.be/)([\w-]{11})"
+    r"|^([\w-]{11})$"
+)
+
+def extract_video_id(query: str) -> Optional[str]:
+    """Video id of a YouTube URL or bare id query, None for searches"""
+    match = VIDEO_ID_RE.match(query.strip())
+    if not match:
+        return None
+    return match.group(1) or match.group(2)
+
+class TrackCache:
+    """Track metadata and stream URLs by video id"""
+    def __init__(self, ttl: int = STREAM_URL_TTL):
+        self.ttl = ttl
+        # Least recently used first, capped at TRACK_METADATA_MAX
+        self.metadata: OrderedDict = OrderedDict()
+        self.stream_urls: Dict[str, tuple] = {}
+
+    def remember(self, data: Dict[str, Any]):
+        video_id = data.get('id')
+        if not video_id:
+            return
+        self.metadata[video_id] = {
+            'title': data.get('title', 'Unknown Title'),
+            'webpage_url': data.get('webpage_url') or data.get('original_url') or video_id,
+            'duration': int(data['duration']) if data.get('duration') else None,
+            'thumbnail': data.get('thumbnail'),
+        }
+        self.metadata.move_to_end(video_id)
+        while len(self.metadata) > TRACK_METADATA_MAX:
+            self.metadata.popitem(last=False)
+        if data.get('url'):
+            self.put_stream_url(video_id, data['url'])
+
+    def song_for(self, video_id: Optional[str], requester: discord.abc.User) -> Optional[Song]:
+        metadata = self.metadata.get(video_id) if video_id else None
+        if not metadata:
+            return None
+        self.metadata.move_to_end(video_id)
+        return Song(
+            title=metadata['title'],
+            webpage_url=metadata['webpage_url'],
+            duration=metadata['duration'],
+            requester_id=requester.id,
+            requester_name=requester.display_name,
+            thumbnail=metadata['thumbnail'],
+            stream_url=None,
+            video_id=video_id
+        )
+
+    def get_stream_url(self, video_id: Optional[str]) -> Optional[str]:
+        entry = self.stream_urls.get(video_id) if video_id else None
+        if not entry:
+            return None
+        url, expires_at = entry
+        if time.time() >= expires_at:
+            self.stream_urls.pop(video_id, None)
+            return None
+        return url
+
+    def put_stream_url(self, video_id: Optional[str], url: str):
+        if video_id:
+            self.stream_urls[video_id] = (url, time.time() + self.ttl)
+
+    def expire(self):
+        now = time.time()
+        for video_id, (_, expires_at) in list(self.stream_urls.items()):
+            if now >= expires_at:
+                del self.stream_urls[video_id]
+
+track_cache = TrackCache()
+
+class PlayStats:
+    """Append-only play log with play counts kept up to date in memory
+
+    Counts are snapshotted with the log offset they cover, so startup only
+    replays log lines written after the last snapshot.
+    """
+    def __init__(self, log_path: str, snapshot_path: str):
+        self.log_path = log_path
+        self.snapshot_path = snapshot_path
+        self.global_counts: Counter = Counter()
+        self.guild_counts: Dict[int, Counter] = {}
+        self.tracks: Dict[str, Dict[str, str]] = {}
+        self.log_offset = 0
+        self.dirty = False
+        self._log_file = None
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self.global_counts = Counter(snapshot['global'])
+            self.guild_counts = {int(guild_id): Counter(counts) for guild_id, counts in snapshot['guilds'].items()}
+            self.tracks = snapshot['tracks']
+            self.log_offset = snapshot['log_offset']
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to load play stats snapshot, rebuilding from log: {e}")
+            self.global_counts, self.guild_counts, self.tracks, self.log_offset = Counter(), {}, {}, 0
+
+        try:
+            with open(self.log_path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() < self.log_offset:
+                    # Log was truncated or replaced, the snapshot no longer matches it
+                    self.global_counts, self.guild_counts, self.log_offset = Counter(), {}, 0
+                f.seek(self.log_offset)
+                replayed = 0
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    self.log_offset += len(line)
+                    try:
+                        _, guild_id, video_id = line.decode('utf-8').rstrip('\n').split('\t')
+                        self._count(int(guild_id), video_id)
+                        replayed += 1
+                    except ValueError:
+                        continue
+            if replayed:
+                self.dirty = True
+                logger.info(f"Replayed {replayed} play log entries")
+        except FileNotFoundError:
+            # Keep the counts but start a new log from the beginning
+            self.log_offset = 0
+
+    def _count(self, guild_id: int, video_id: str):
+        self.global_counts[video_id] += 1
+        self.guild_counts.setdefault(guild_id, Counter())[video_id] += 1
+
+    def record(self, guild_id: int, song: Song):
+        if not song.video_id:
+            return
+        try:
+            if self._log_file is None:
+                self._log_file = open(self.log_path, 'ab')
+                self._log_file.seek(0, os.SEEK_END)
+                # Anything past our offset is a partial line from a crash, drop it
+                if self._log_file.tell() > self.log_offset:
+                    self._log_file.truncate(self.log_offset)
+            line = f"{int(time.time())}\t{guild_id}\t{song.video_id}\n".encode('utf-8')
+            self._log_file.write(line)
+            self._log_file.flush()
+            self.log_offset = self._log_file.tell()
+        except OSError as e:
+            logger.error(f"Failed to append to play log: {e}")
+            return
+
+        self._count(guild_id, song.video_id)
+        self.tracks[song.video_id] = {'title': song.title, 'webpage_url': song.webpage_url}
+        self.dirty = True
+
+    def top(self, n: int, guild_id: Optional[int] = None) -> List[tuple]:
+        counts = self.global_counts if guild_id is None else self.guild_counts.get(guild_id, Counter())
+        return counts.most_common(n)
+
+    def title_for(self, video_id: str) -> str:
+        metadata = track_cache.metadata.get(video_id) or self.tracks.get(video_id)
+        return metadata['title'] if metadata else video_id
+
+    def prune_tracks(self):
+        """Keep titles and URLs only for tracks that /stats top or warming can show"""
+        keep = {video_id for video_id, _ in self.top(max(WARM_TOP_GLOBAL, STATS_TOP_COUNT))}
+        for guild_id in self.guild_counts:
+            keep.update(video_id for video_id, _ in self.top(max(WARM_TOP_PER_GUILD, STATS_TOP_COUNT), guild_id))
+        self.tracks = {video_id: track for video_id, track in self.tracks.items() if video_id in keep}
+
+    async def save_snapshot(self):
+        if not self.dirty:
+            return
+        self.prune_tracks()
+        snapshot = {
+            'global': dict(self.global_counts),
+            'guilds': {str(guild_id): dict(counts) for guild_id, counts in self.guild_counts.items()},
+            'tracks': dict(self.tracks),
+            'log_offset': self.log_offset,
+        }
+        self.dirty = False
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, self._write_snapshot, snapshot)
+        except Exception as e:
+            self.dirty = True
+            logger.error(f"Failed to save play stats snapshot: {e}")
+
+    def _write_snapshot(self, snapshot: Dict[str, Any]):
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.snapshot_path)
+
+play_stats = PlayStats(PLAY_LOG_FILE, PLAY_STATS_FILE)
+
+async def warm_caches():
+    """Resolve metadata and stream URLs for the most played tracks, one at a time"""
+    # Rank global and per-guild favourites by play count, then keep the best
+    scores: Dict[str, int] = dict(play_stats.top(WARM_TOP_GLOBAL))
+    for guild_id in play_stats.guild_counts:
+        for video_id, count in play_stats.top(WARM_TOP_PER_GUILD, guild_id):
+            scores[video_id] = max(scores.get(video_id, 0), count)
+    video_ids = sorted(scores, key=scores.get, reverse=True)[:WARM_MAX_TRACKS]
+    if not video_ids:
+        return
+
+    logger.info(f"Warming caches for {len(video_ids)} popular tracks")
+    loop = asyncio.get_event_loop()
+    ytdl_instance = yt_dlp.YoutubeDL(YTDL_OPTS)
+    warmed = 0
+
+    for video_id in video_ids:
+        if track_cache.get_stream_url(video_id):
+            continue
+        # yt-dlp accepts a bare YouTube id when the page URL is unknown
+        url = play_stats.tracks.get(video_id, {}).get('webpage_url') or video_id
+        try:
+            data = await loop.run_in_executor(None, lambda: ytdl_instance.extract_info(url, download=False))
+            if data:
+                track_cache.remember(data)
+                warmed += 1
+        except Exception as e:
+            logger.warning(f"Failed to warm cache for {video_id}: {e}")
+        await asyncio.sleep(WARM_INTERVAL_SECONDS)
+
+    logger.info(f"Warmed caches for {warmed}/{len(video_ids)} tracks")
+
 # ----- Enhanced Music Controls View -----
 class MusicControls(discord.ui.View):
     def __init__(self, guild_id: int, ctx_channel_id: int):
@@ -368,6 +1130,7 @@ class MusicControls(discord.ui.View):
             state.history.clear()
             state.current = None
             state.skip_votes.clear()
+            discard_prepared(state)
             vc.stop()
             await vc.disconnect()
             await interaction.response.send_message("⏹️ Stopped playback and disconnected", ephemeral=True)
@@ -396,6 +1159,106 @@ class MusicControls(discord.ui.View):
             
         await interaction.response.send_message(f"🔉 Volume: {int(state.volume * 100)}%", ephemeral=True)
 
+# ----- Queue Pagination -----
+QUEUE_PAGE_SIZE = 10
+
+def queue_page_count(state: GuildMusic) -> int:
+    return max(1, -(-len(state.queue) // QUEUE_PAGE_SIZE))
+
+def build_queue_embed(state: GuildMusic, page: int) -> discord.Embed:
+    """Render one page of the queue, reusing cached pages until the queue changes"""
+    key = (state.queue.version, id(state.current))
+    if state.queue_embeds_key != key:
+        state.queue_embeds.clear()
+        state.queue_embeds_key = key
+
+    embed = state.queue_embeds.get(page)
+    if embed:
+        return embed
+
+    embed = discord.Embed(title="🎵 Music Queue", color=discord.Color.green())
+
+    if state.current:
+        embed.add_field(
+            name="Now Playing",
+            value=f"**{state.current.title}**\n{state.current.duration_str()} | {state.current.requester_mention or 'Unknown'}",
+            inline=False
+        )
+
+    if state.queue:
+        start = page * QUEUE_PAGE_SIZE
+        queue_text = ""
+        for idx, song in enumerate(state.queue.page(start, QUEUE_PAGE_SIZE), start + 1):
+            queue_text += f"`{idx}.` **{song.title}** ({song.duration_str()}) | {song.requester_mention or 'Unknown'}\n"
+        embed.add_field(name="Up Next", value=queue_text, inline=False)
+
+        top_requesters = [
+            f"<@{user_id}> ({count})" for user_id, count in state.queue.requester_counts.most_common(3) if user_id
+        ]
+        if top_requesters:
+            embed.add_field(name="Top Requesters", value=", ".join(top_requesters), inline=False)
+    else:
+        embed.add_field(name="Up Next", value="No songs in queue", inline=False)
+
+    total = format_duration(state.queue.total_duration)
+    if state.queue.unknown_durations:
+        total += "+"
+    embed.set_footer(
+        text=f"Page {page + 1}/{queue_page_count(state)} | {len(state.queue)} songs | Total duration: {total}"
+    )
+
+    state.queue_embeds[page] = embed
+    return embed
+
+class QueueView(discord.ui.View):
+    def __init__(self, guild_id: int):
+        super().__init__(timeout=300)  # 5 minute timeout
+        self.guild_id = guild_id
+        self.page = 0
+        self.message: Optional[discord.Message] = None
+
+    async def on_timeout(self):
+        """Disable all buttons on timeout"""
+        for item in self.children:
+            if isinstance(item, discord.ui.Button):
+                item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.NotFound:
+                pass
+
+    def render(self) -> discord.Embed:
+        state = get_guild_state(self.guild_id)
+        last_page = queue_page_count(state) - 1
+        # The queue may have shrunk since the last render
+        self.page = min(self.page, last_page)
+
+        self.first.disabled = self.previous.disabled = self.page == 0
+        self.next.disabled = self.last.disabled = self.page == last_page
+        return build_queue_embed(state, self.page)
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        self.page = max(page, 0)
+        embed = self.render()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="⏮", style=discord.ButtonStyle.secondary)
+    async def first(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, 0)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.primary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.primary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+    @discord.ui.button(label="⏭", style=discord.ButtonStyle.secondary)
+    async def last(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, queue_page_count(get_guild_state(self.guild_id)) - 1)
+
 # ----- Enhanced Playback Helpers -----
 async def ensure_voice(ctx_or_interaction) -> Optional[discord.VoiceClient]:
     """Ensure the bot is in the user's voice channel"""
@@ -445,13 +1308,18 @@ async def _play_next(guild: discord.Guild):
     async with state.lock:
         # Clear skip votes when moving to next song
         state.skip_votes.clear()
+
+        if state.prepare_task and not state.prepare_task.done():
+            state.prepare_task.cancel()
+        state.prepare_task = None
         
         if state.loop and state.current:
             # Re-add current song to queue if loop is enabled
-            state.queue.insert(0, state.current)
+            state.queue.appendleft(state.current)
         
         if not state.queue:
             state.current = None
+            discard_prepared(state)
             # Disconnect after 1 minute of inactivity
             await asyncio.sleep(60)
             vc = guild.voice_client
@@ -459,7 +1327,7 @@ async def _play_next(guild: discord.Guild):
                 await vc.disconnect()
             return
             
-        next_song = state.queue.pop(0)
+        next_song = state.queue.popleft()
         state.current = next_song
         state.history.append(next_song)
         
@@ -469,21 +1337,48 @@ async def _play_next(guild: discord.Guild):
         
         vc = guild.voice_client
         if not vc or not vc.is_connected():
+            # Disconnected without going through stop/leave, e.g. kicked from voice
+            state.current = None
+            discard_prepared(state)
             return
             
         try:
-            # Resolve stream URL if needed
-            if not next_song.stream_url:
-                await YTDLSource.resolve_stream_url(next_song)
-                
-            # Create audio source with error handling
-            source = discord.FFmpegPCMAudio(
-                next_song.stream_url, 
-                **FFMPEG_OPTIONS
-            )
-            volume_adjusted = discord.PCMVolumeTransformer(source, volume=state.volume)
+            adapt_read_ahead(state, state.playing_buffer)
+            state.playing_buffer = None
+
+            # Use the pre-spawned source if it is for this song
+            prepared = state.prepared
+            state.prepared = None
+            if prepared and prepared.song is next_song:
+                prespawn_limiter.release()
+                source = prepared.source
+            else:
+                if prepared:
+                    prepared.source.cleanup()
+                    prespawn_limiter.release()
+
+                # Resolve stream URL if needed
+                if not next_song.stream_url:
+                    await YTDLSource.resolve_stream_url(next_song)
+
+                # Create audio source with error handling
+                source = RingBufferSource(
+                    discord.FFmpegPCMAudio(
+                        next_song.stream_url, 
+                        **FFMPEG_OPTIONS
+                    ),
+                    state.read_ahead_frames
+                )
+            state.playing_buffer = source
+            gain = loudness_cache.gain_for(next_song)
+            if gain is None:
+                gain = DEFAULT_TRACK_GAIN
+                loudness_cache.schedule(next_song)
+            volume_adjusted = PlaybackSource(source, next_song, volume=state.volume, gain=gain)
             
             vc.play(volume_adjusted, after=lambda e: _play_next_after(guild, e))
+            state.prepare_task = asyncio.create_task(_prepare_next(guild, volume_adjusted))
+            play_stats.record(guild.id, next_song)
             
             # Send now playing message
             await send_now_playing(guild, next_song)
@@ -515,8 +1410,8 @@ async def send_now_playing(guild: discord.Guild, song: Song):
             color=discord.Color.blue()
         )
         embed.add_field(name="Duration", value=song.duration_str(), inline=True)
-        if song.requester:
-            embed.add_field(name="Requested by", value=song.requester.mention, inline=True)
+        if song.requester_mention:
+            embed.add_field(name="Requested by", value=song.requester_mention, inline=True)
         
         if song.thumbnail:
             embed.set_thumbnail(url=song.thumbnail)
@@ -557,6 +1452,7 @@ async def slash_leave(interaction: discord.Interaction):
         state.queue.clear()
         state.current = None
         state.skip_votes.clear()
+        discard_prepared(state)
         await vc.disconnect()
         guild_states.pop(interaction.guild.id, None)
         state_message_channel_map.pop(interaction.guild.id, None)
@@ -612,29 +1508,9 @@ async def slash_queue(interaction: discord.Interaction):
         await interaction.followup.send("🎵 The queue is empty")
         return
 
-    embed = discord.Embed(title="🎵 Music Queue", color=discord.Color.green())
-    
-    if state.current:
-        embed.add_field(
-            name="Now Playing",
-            value=f"**{state.current.title}**\n{state.current.duration_str()} | {state.current.requester.mention if state.current.requester else 'Unknown'}",
-            inline=False
-        )
-
-    if state.queue:
-        queue_text = ""
-        for idx, song in enumerate(state.queue[:10], 1):
-            queue_text += f"`{idx}.` **{song.title}** ({song.duration_str()}) | {song.requester.mention if song.requester else 'Unknown'}\n"
-        
-        if len(state.queue) > 10:
-            queue_text += f"\n... and {len(state.queue) - 10} more songs"
-            
-        embed.add_field(name="Up Next", value=queue_text, inline=False)
-    else:
-        embed.add_field(name="Up Next", value="No songs in queue", inline=False)
-
-    embed.set_footer(text=f"Total songs in queue: {len(state.queue)}")
-    await interaction.followup.send(embed=embed)
+    view = QueueView(interaction.guild.id)
+    message = await interaction.followup.send(embed=view.render(), view=view)
+    view.message = message
 
 @tree.command(name="skip", description="Skip the current song")
 async def slash_skip(interaction: discord.Interaction):
@@ -713,9 +1589,41 @@ async def slash_clear(interaction: discord.Interaction):
     queue_size = len(state.queue)
     state.queue.clear()
     state.skip_votes.clear()
+    if not state.loop:
+        discard_prepared(state)
     
     await interaction.response.send_message(f"✅ Cleared {queue_size} songs from the queue")
 
+stats_group = app_commands.Group(name="stats", description="Play statistics")
+
+@stats_group.command(name="top", description="Show the most played tracks")
+@app_commands.describe(scope="This server or all servers")
+@app_commands.choices(scope=[
+    app_commands.Choice(name="This server", value="server"),
+    app_commands.Choice(name="Global", value="global"),
+])
+async def slash_stats_top(interaction: discord.Interaction, scope: str = "server"):
+    """Show the most played tracks from the precomputed play counts"""
+    guild_id = interaction.guild.id if scope == "server" else None
+    top = play_stats.top(STATS_TOP_COUNT, guild_id)
+
+    if not top:
+        await interaction.response.send_message("📊 No plays recorded yet", ephemeral=True)
+        return
+
+    lines = [
+        f"`{idx}.` **{play_stats.title_for(video_id)}** ({count} plays)"
+        for idx, (video_id, count) in enumerate(top, 1)
+    ]
+    embed = discord.Embed(
+        title="📊 Top Tracks" + (" on this server" if guild_id else " globally"),
+        description="\n".join(lines),
+        color=discord.Color.purple()
+    )
+    await interaction.response.send_message(embed=embed)
+
+tree.add_command(stats_group)
+
 # Enhanced error handling
 @bot.event
 async def on_voice_state_update(member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
@@ -732,6 +1640,7 @@ async def on_voice_state_update(member: discord.Member, before: discord.VoiceSta
             state = get_guild_state(guild.id)
             state.queue.clear()
             state.current = None
+            discard_prepared(state)
             await vc.disconnect()
             logger.info(f"Auto-disconnected from {guild.name} due to being alone")
 